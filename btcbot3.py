@@ -1,11 +1,47 @@
 import os
+import json
+import math
 import time
+import queue
+import atexit
+import asyncio
 import logging
+import threading
+from logging.handlers import MemoryHandler
 from datetime import datetime
-from binance.client import Client
+import aiohttp
+from binance import AsyncClient, BinanceSocketManager
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ==============================
+# ⚡ Optional fast JSON (orjson)
+# ==============================
+# orjson parses ~3-5x faster than stdlib json. Route the websocket stream
+# decode (the hot path at ~1+ msg/s) and the requests/Telegram responses
+# through it; fall back silently when it isn't installed.
+try:
+    import orjson
+
+    class _OrjsonShim:
+        loads = staticmethod(orjson.loads)
+
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+    class _StreamJsonShim(_OrjsonShim):
+        dumps = staticmethod(json.dumps)  # websocket subscribe frames expect str
+
+    import requests.models as _rm
+    import binance.streams as _streams
+    _rm.complexjson = _OrjsonShim
+    _streams.json = _StreamJsonShim
+except ImportError:
+    pass
 
 # ==============================
 # 🔐 Load environment variables
@@ -16,7 +52,18 @@ API_SECRET = os.getenv("BINANCE_API_SECRET")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-client = Client(API_KEY, API_SECRET)
+# Async client — created in main() since AsyncClient.create() must be awaited.
+# aiohttp pools and keeps connections alive by itself, so no adapter mounting.
+client = None
+
+async def _keepalive_loop():
+    """Ping Binance every 30s so the pooled connection never goes idle."""
+    while True:
+        try:
+            await client.ping()
+        except Exception as e:
+            log_warn("⚠️ Keepalive ping failed: %s", e)
+        await asyncio.sleep(30)
 
 # ==============================
 # 🪵 Logging setup
@@ -29,160 +76,390 @@ logger.setLevel(logging.INFO)
 if logger.hasHandlers():
     logger.handlers.clear()
 
-# File handler (append mode, no overwrite)
-fh = logging.FileHandler(log_file)
+# File handler (append mode, no overwrite) with a large write buffer so
+# the per-tick status lines coalesce into block-sized writes
+class BufferedFileHandler(logging.FileHandler):
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=64 * 1024, encoding=self.encoding)
+
+fh = BufferedFileHandler(log_file, delay=True)
 fh.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
 
+# Buffer records in memory; hit disk every 64 records or on any ERROR
+mh = MemoryHandler(capacity=64, flushLevel=logging.ERROR, target=fh)
+atexit.register(mh.flush)
+
 # Stream handler (console output)
 ch = logging.StreamHandler()
 ch.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
 
-logger.addHandler(fh)
+logger.addHandler(mh)
 logger.addHandler(ch)
 
+# Skip the per-record caller stack walk and thread/process id lookups —
+# none of them appear in our format string
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging._srcfile = None
+
+# Bound methods: no root-logger lookup per call, and %-style args defer
+# formatting to the handler instead of building f-strings up front
+log_info = logger.info
+log_warn = logger.warning
+log_err = logger.error
+
 # ==============================
 # 📩 Telegram notifier
 # ==============================
+# One shared session keeps the HTTPS connection to api.telegram.org warm,
+# skipping the TCP+TLS handshake on every alert after the first one.
+TG_SESSION = requests.Session()
+TG_SESSION.headers.update({'Connection': 'keep-alive'})
+TG_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, connect=2, read=2, backoff_factor=0.3,
+                      status_forcelist=[502, 503, 504]),
+))
+TG_TIMEOUT = (2, 5)  # (connect, read) — a dead Telegram must not hang the worker
+
+# Sends go through a queue drained by a daemon thread, so callers return
+# immediately and a slow Telegram API never stalls the trading loop.
+TG_Q = queue.Queue(maxsize=100)
+
+def _tg_worker():
+    while True:
+        message = TG_Q.get()
+        try:
+            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
+            TG_SESSION.post(url, data=payload, timeout=TG_TIMEOUT)
+        except Exception as e:
+            log_err("❌ Telegram Error: %s", e)
+
+threading.Thread(target=_tg_worker, daemon=True).start()
+
 def send_telegram_message(message):
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        log_warn("Telegram credentials missing. Skipping notification.")
+        return
     try:
-        if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-            logging.warning("Telegram credentials missing. Skipping notification.")
-            return
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-        requests.post(url, data=payload)
-    except Exception as e:
-        logging.error(f"❌ Telegram Error: {e}")
+        TG_Q.put_nowait(message)
+    except queue.Full:
+        log_warn("⚠️ Telegram queue full — dropping: %s", message)
 
 # ==============================
 # 🧠 Recover last trade price from log
 # ==============================
-def get_last_trade_price_from_log(log_path):
+def get_last_trade_price_from_log(log_path, chunk_size=8192):
+    """Return (price, action) of the last trade confirmation, or (None, None)."""
+    # The log only grows, and the line we want is near the end — read it
+    # backwards in fixed-size blocks instead of loading the whole file.
+    # Trade confirmations are the lines flushed to disk immediately, so
+    # they are the only ones recovery can rely on.
     try:
-        with open(log_path, 'r') as f:
-            lines = f.readlines()
-        # Go through the log backwards to find the last buy entry
-        for line in reversed(lines):
-            if "Last Trade:" in line and "Action: buy" in line:
-                parts = line.strip().split("Last Trade:")
-                if len(parts) > 1:
-                    price_part = parts[1].split(",")[0].strip().replace('$', '')
-                    return float(price_part)
+        with open(log_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            buf = b''
+            while pos > 0:
+                read_size = min(chunk_size, pos)
+                pos -= read_size
+                f.seek(pos)
+                buf = f.read(read_size) + buf
+                lines = buf.split(b'\n')
+                if pos > 0:
+                    # first element may be a partial line — keep it for the next block
+                    buf = lines.pop(0)
+                for line in reversed(lines):
+                    if b"Bought" in line and b"at $" in line:
+                        action = "buy"
+                    elif b"Sold" in line and b"at $" in line:
+                        action = "sell"
+                    else:
+                        continue
+                    price_part = line.rsplit(b"at $", 1)[1].split(b" ", 1)[0]
+                    return float(price_part.strip().decode()), action
     except Exception as e:
-        logging.warning(f"⚠️ Could not recover last trade from log: {e}")
-    return None
+        log_warn("⚠️ Could not recover last trade from log: %s", e)
+    return None, None
 
 # ==============================
 # ⚙️ Bot configuration
 # ==============================
-def get_btc_precision():
-    symbol_info = client.get_symbol_info('BTCUSDT')
+PRECISION_CACHE = os.path.expanduser('~/.btcbot_precision.json')
+PRECISION_MAX_AGE = 86400  # refresh the LOT_SIZE step daily
+
+def load_cached_precision():
+    try:
+        with open(PRECISION_CACHE) as f:
+            data = json.load(f)
+        if time.time() - data['ts'] < PRECISION_MAX_AGE:
+            return data
+    except Exception:
+        pass
+    return None
+
+async def fetch_btc_precision():
+    symbol_info = await client.get_symbol_info('BTCUSDT')
     lot_size_filter = next(f for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE')
-    step_size = float(lot_size_filter['stepSize'])
-    return len('{:f}'.format(step_size).split('.')[1].rstrip('0'))
+    step_str = lot_size_filter['stepSize']
+    data = {'step': step_str, 'ts': time.time()}
+    try:
+        with open(PRECISION_CACHE, 'w') as f:
+            json.dump(data, f)
+    except Exception as e:
+        log_warn("⚠️ Could not write precision cache: %s", e)
+    return data
 
-BTC_PRECISION = get_btc_precision()
+INV_STEP = None  # 1/stepSize as an exact int — quantities get floored onto the LOT_SIZE grid
 TRADE_AMOUNT_USDT = 20
 
+# Thresholds are recomputed only when last_trade_price changes, so each
+# websocket tick costs a plain float compare instead of two multiplies
+_buy_trigger = None
+_sell_trigger = None
+
+def _update_triggers():
+    global _buy_trigger, _sell_trigger
+    if last_trade_price is None:
+        _buy_trigger = _sell_trigger = None
+    else:
+        _buy_trigger = last_trade_price * 0.99   # buy on a 1% dip
+        _sell_trigger = last_trade_price * 1.05  # sell on a 5% pump
+
 # Load previous trade state from log if available
-last_trade_price = get_last_trade_price_from_log(log_file)
-last_action = "buy" if last_trade_price else None  # assume last action was buy if price found
+last_trade_price, last_action = get_last_trade_price_from_log(log_file)
+_update_triggers()
 
 if last_trade_price:
-    logging.info(f"📂 Recovered last trade price from log: ${last_trade_price}")
+    log_info("📂 Recovered last trade from log: $%s (%s)", last_trade_price, last_action)
 else:
-    logging.info("📂 No previous trade found in log.")
+    log_info("📂 No previous trade found in log.")
+
+# ==============================
+# 👛 Live balances from user-data stream
+# ==============================
+BALANCES = {'USDT': 0.0, 'BTC': 0.0}
+_balance_ts = 0.0      # monotonic time of the last snapshot (stream or REST)
+BALANCE_MAX_AGE = 5.0  # fall back to REST once the pushed data is older than this
+
+async def watch_user_stream():
+    """Track balances Binance pushes to us instead of polling REST per trade."""
+    global _balance_ts
+    bsm = BinanceSocketManager(client)
+    # user_socket renews the listenKey in the background for us
+    async with bsm.user_socket() as stream:
+        while True:
+            msg = await stream.recv()
+            event = msg.get('e') if isinstance(msg, dict) else None
+            if event == 'outboundAccountPosition':
+                for bal in msg['B']:
+                    if bal['a'] in BALANCES:
+                        BALANCES[bal['a']] = float(bal['f'])
+                _balance_ts = time.monotonic()
+            elif event == 'balanceUpdate' and msg.get('a') in BALANCES:
+                # deposits/withdrawals arrive as deltas
+                BALANCES[msg['a']] += float(msg['d'])
+                _balance_ts = time.monotonic()
 
 # ==============================
 # 📈 Helpers
 # ==============================
-def get_price():
-    return float(client.get_symbol_ticker(symbol="BTCUSDT")['price'])
+async def get_price():
+    ticker = await client.get_symbol_ticker(symbol="BTCUSDT")
+    return float(ticker['price'])
+
+async def get_balances(force=False):
+    global _balance_ts
+    if not force and time.monotonic() - _balance_ts < BALANCE_MAX_AGE:
+        return BALANCES['USDT'], BALANCES['BTC']
+    # Snapshot stale (or reconciliation forced) — refresh in parallel over REST
+    usdt_bal, btc_bal = await asyncio.gather(
+        client.get_asset_balance(asset='USDT'),
+        client.get_asset_balance(asset='BTC'),
+    )
+    BALANCES['USDT'] = float(usdt_bal['free'])
+    BALANCES['BTC'] = float(btc_bal['free'])
+    _balance_ts = time.monotonic()
+    return BALANCES['USDT'], BALANCES['BTC']
+
+# ==============================
+# 📡 Live price from websocket
+# ==============================
+latest_price = None
+_tick_event = asyncio.Event()  # set on every websocket push, checked by the safety timer
 
-def get_balances():
-    usdt = float(client.get_asset_balance(asset='USDT')['free'])
-    btc = float(client.get_asset_balance(asset='BTC')['free'])
-    return usdt, btc
+async def watch_ticker():
+    """Read the miniTicker stream — cache the price and evaluate immediately."""
+    global latest_price
+    bsm = BinanceSocketManager(client)
+    async with bsm.symbol_miniticker_socket('BTCUSDT') as stream:
+        while True:
+            msg = await stream.recv()
+            try:
+                price = float(msg['c'])
+            except (KeyError, TypeError, ValueError):
+                log_warn("⚠️ Unexpected ticker message: %s", msg)
+                continue
+            latest_price = price
+            _tick_event.set()
+            await evaluate_strategy(price)
 
 # ==============================
 # 🛒 Execute Buy
 # ==============================
-def execute_buy():
+async def execute_buy():
     try:
-        usdt, _ = get_balances()
+        usdt, _ = await get_balances()
         if usdt < TRADE_AMOUNT_USDT:
-            logging.warning("⚠️ Insufficient USDT to buy.")
+            log_warn("⚠️ Insufficient USDT to buy.")
             return False
 
-        price = get_price()
-        btc_amount = round(TRADE_AMOUNT_USDT / price, BTC_PRECISION)
-        order = client.order_market_buy(symbol='BTCUSDT', quantity=btc_amount)
+        price = await get_price()
+        # Floor onto the LOT_SIZE grid — round() can land just above a step
+        # boundary and get the order rejected with -1013
+        btc_amount = math.floor(TRADE_AMOUNT_USDT / price * INV_STEP) / INV_STEP
+        order = await client.order_market_buy(symbol='BTCUSDT', quantity=btc_amount)
 
         msg = f"✅ Bought ${TRADE_AMOUNT_USDT} BTC at ${price:.2f} (~{btc_amount} BTC)"
-        logging.info(msg)
+        log_info(msg)
+        mh.flush()  # trade lines must hit disk — crash recovery reads them back
         send_telegram_message(msg)
         return price
 
     except Exception as e:
-        logging.error(f"❌ Buy error: {e}")
+        log_err("❌ Buy error: %s", e)
         send_telegram_message(f"❌ Buy error: {e}")
         return False
 
 # ==============================
 # 💰 Execute Sell
 # ==============================
-def execute_sell():
+async def execute_sell():
     try:
-        _, btc = get_balances()
+        _, btc = await get_balances()
         if btc <= 0:
-            logging.warning("⚠️ No BTC to sell.")
+            log_warn("⚠️ No BTC to sell.")
             return False
 
-        btc_amount = round(btc, BTC_PRECISION)
-        order = client.order_market_sell(symbol='BTCUSDT', quantity=btc_amount)
-        price = get_price()
+        btc_amount = math.floor(btc * INV_STEP) / INV_STEP
+        order = await client.order_market_sell(symbol='BTCUSDT', quantity=btc_amount)
+        price = await get_price()
 
         msg = f"✅ Sold {btc_amount} BTC at ${price:.2f}"
-        logging.info(msg)
+        log_info(msg)
+        mh.flush()  # trade lines must hit disk — crash recovery reads them back
         send_telegram_message(msg)
         return price
 
     except Exception as e:
-        logging.error(f"❌ Sell error: {e}")
+        log_err("❌ Sell error: %s", e)
         send_telegram_message(f"❌ Sell error: {e}")
         return False
 
 # ==============================
-# 🌀 Main loop
+# 🧠 Strategy
 # ==============================
-if __name__ == "__main__":
-    logging.info("🤖 BTCBot3 started — trading on 1% dips and 5% pumps.")
-
-    while True:
-        try:
-            price = get_price()
-            usdt, btc = get_balances()
+# One evaluation at a time — the tick handler and the safety-timer fallback
+# must never both fire an order off the same stale state
+_strategy_lock = asyncio.Lock()
 
+async def evaluate_strategy(price):
+    global last_trade_price, last_action
+    try:
+        async with _strategy_lock:
             if last_action == "sell" or last_action is None:
                 # Buy if no trade yet or price dips 1%
-                if last_trade_price is None or price <= last_trade_price * 0.99:
-                    new_price = execute_buy()
+                if _buy_trigger is None or price <= _buy_trigger:
+                    new_price = await execute_buy()
                     if new_price:
                         last_trade_price = new_price
                         last_action = "buy"
+                        _update_triggers()
 
             elif last_action == "buy":
                 # Sell if price rises 5%
-                if price >= last_trade_price * 1.05:
-                    new_price = execute_sell()
+                if price >= _sell_trigger:
+                    new_price = await execute_sell()
                     if new_price:
                         last_trade_price = new_price
                         last_action = "sell"
+                        _update_triggers()
 
-            logging.info(f"📊 Current Price: ${price:.2f}, Last Trade: ${last_trade_price}, Action: {last_action}")
-            time.sleep(60)
+    except Exception as e:
+        log_err("❌ Strategy error: %s", e)
+        send_telegram_message(f"❌ Strategy error: {e}")
+
+# ==============================
+# 🌀 Main loop
+# ==============================
+def _on_task_done(task):
+    # Background tasks must not die silently — the bot would quietly degrade
+    # to one REST evaluation per minute
+    if task.cancelled():
+        return
+    e = task.exception()
+    if e:
+        log_err("❌ Background task %s died: %s", task.get_name(), e)
+        send_telegram_message(f"❌ Background task {task.get_name()} died: {e}")
+
+async def main():
+    global client, INV_STEP
+    log_info("🤖 BTCBot3 started — trading on 1% dips and 5% pumps.")
+
+    # Bound every Binance call — a half-open TCP connection must never
+    # freeze the loop while prices keep moving
+    client = await AsyncClient.create(API_KEY, API_SECRET, requests_params={
+        'timeout': aiohttp.ClientTimeout(connect=2, sock_read=5),
+    })
+
+    precision_data = load_cached_precision() or await fetch_btc_precision()
+    # Step sizes are powers of ten, so the reciprocal rounds to an exact int.
+    # A bare 1/float('0.00001000') is 99999.99999999999 and would put every
+    # floored quantity off the grid.
+    INV_STEP = round(1 / float(precision_data['step']))
+
+    # Hold the references — the loop only keeps weak ones — and get alerted
+    # if a watcher crashes for good
+    tasks = [
+        asyncio.create_task(_keepalive_loop(), name='keepalive'),
+        asyncio.create_task(watch_ticker(), name='ticker'),
+        asyncio.create_task(watch_user_stream(), name='user-stream'),
+    ]
+    for task in tasks:
+        task.add_done_callback(_on_task_done)
+
+    while True:
+        try:
+            # Balance refresh still fires both REST calls concurrently; the
+            # price comes straight from the websocket cache
+            usdt, btc = await get_balances()
+
+            if latest_price is not None:
+                log_info("📊 Current Price: $%.2f, Last Trade: $%s, Action: %s", latest_price, last_trade_price, last_action)
+            else:
+                log_info("📊 Waiting for first websocket tick...")
+
+            # The 60s cadence is now purely a safety timer: ticks drive the
+            # strategy, but if the stream goes quiet for a whole minute we
+            # evaluate on the REST price so the bot never sits blind.
+            _tick_event.clear()
+            await asyncio.sleep(60)
+            if not _tick_event.is_set():
+                log_warn("⚠️ No websocket tick for 60s — evaluating on REST price.")
+                # the price from before the sleep is a minute old — fetch fresh
+                price = await get_price()
+                # the stream may have come back while we waited on REST;
+                # if a tick landed it already evaluated on fresher data
+                if not _tick_event.is_set():
+                    await evaluate_strategy(price)
 
         except Exception as e:
-            logging.error(f"❌ Main loop error: {e}")
+            log_err("❌ Main loop error: %s", e)
             send_telegram_message(f"❌ Main loop error: {e}")
-            time.sleep(60)
+            await asyncio.sleep(60)
+
+if __name__ == "__main__":
+    asyncio.run(main())